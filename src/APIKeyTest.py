@@ -1,19 +1,10 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-from utils import load_openai_api_key
-
-
 def main():
 
-    load_dotenv()
-
-    key = os.getenv("OPENAI_API_KEY")
+    # Heavy imports live here so importing this module has no cost or side effects
+    from openai import OpenAI
+    from utils import load_openai_api_key  # loads .env into the environment
 
-    if not key:
-        key = load_openai_api_key(".env")
-        os.environ["OPENAI_API_KEY"] = key
+    key = load_openai_api_key(".env")
 
     print(" Using key prefix:", key[:10], "...")
 
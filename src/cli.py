@@ -1,15 +1,21 @@
 import argparse
 import json
+import threading
 from typing import List
 
 from utils import get_openai_client
-from retriever import search_books
+from retriever import search_books, warmup
 from tools import get_summary_by_title, match_title
 
 
 PERSIST_DIR = "./data/embeddings"
 COLLECTION_NAME = "books_summaries"
 
+# Skip the GPT pick when the top result scores at least this much...
+TOP1_SCORE = 0.85
+# ...or beats the second one by more than this margin
+TOP1_MARGIN = 0.15
+
 
 def _pick_from_titles(user_query: str, titles: List[str], client) -> str:
     """
@@ -34,25 +40,43 @@ def _pick_from_titles(user_query: str, titles: List[str], client) -> str:
         },
     ]
 
-    # Ask GPT to make the choice
-    reply = client.chat.completions.create(
+    # Ask GPT to make the choice, printing its answer as it streams in
+    # (the first line is the chosen title, then the reasoning)
+    print("\n=== Recommendation (RAG) ===")
+    stream = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         temperature=0.2,
-    ).choices[0].message.content or ""
+        stream=True,
+    )
+    parts = []
+    for chunk in stream:
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if text:
+            print(text, end="", flush=True)
+            parts.append(text)
+    print()
+    reply = "".join(parts)
 
     # heuristic: pick the first title that appears in reply; fallback to top-1
-    chosen = next((t for t in titles if t.lower() in reply.lower()), titles[0])
-
-    # Print the recommendation and GPT’s reasoning
-    print("\n=== Recommendation (RAG) ===")
-    print(chosen)
-    if reply.strip():
-        print("\nReasoning:")
-        print(reply.strip())
+    chosen = next((t for t in titles if t.lower() in reply.lower()), None)
+    if chosen is None:
+        chosen = titles[0]
+        print(f"(No listed title in the reply; using the top result: {chosen})")
     return chosen
 
 
+def _is_obvious_top1(candidates) -> bool:
+    """
+    True when the top search result clearly wins (single candidate, a very high
+    score, or a large margin over the runner-up), so GPT doesn't need to choose.
+    """
+    if len(candidates) == 1:
+        return True
+    top, second = candidates[0].get("score", 0.0), candidates[1].get("score", 0.0)
+    return top >= TOP1_SCORE or top - second > TOP1_MARGIN
+
+
 def handle_query(user_query: str):
     """
     Handle a user query end-to-end:
@@ -61,9 +85,7 @@ def handle_query(user_query: str):
     - Always fetch and display the verbatim summary from JSON.
     """
 
-    client = get_openai_client()
-
-    # Try title-based path first
+    # Try title-based path first (no OpenAI client needed here)
     fixed_title = match_title(user_query) or user_query  # try fuzzy; fall back to raw
     summary = get_summary_by_title(fixed_title)
     if summary:
@@ -75,14 +97,21 @@ def handle_query(user_query: str):
 
     # If no title was found then we use RAG semantic search
     print("No direct title match. Running semantic search (RAG)…")
-    candidates = search_books(user_query, PERSIST_DIR, COLLECTION_NAME, k=3)
-    titles = [c.get("title") for c in candidates if c.get("title")]
+    candidates = [c for c in search_books(user_query, PERSIST_DIR, COLLECTION_NAME, k=3) if c.get("title")]
+    titles = [c["title"] for c in candidates]
     if not titles:
         print("No results found in your local library.")
         return
 
-    # Constrain GPT to only pick one of the retrieved titles
-    chosen = _pick_from_titles(user_query, titles, client)
+    if _is_obvious_top1(candidates):
+        # Clear winner: no need to ask GPT to choose
+        chosen = titles[0]
+        print("\n=== Recommendation (RAG) ===")
+        print(chosen)
+    else:
+        # Constrain GPT to only pick one of the retrieved titles
+        client = get_openai_client()
+        chosen = _pick_from_titles(user_query, titles, client)
     if not chosen:
         print("Could not select a title from candidates.")
         return
@@ -115,6 +144,8 @@ def main():
     if args.query:
         user_query = " ".join(args.query).strip()
     else:
+        # Load the index in the background while the user is typing
+        threading.Thread(target=warmup, args=(PERSIST_DIR, COLLECTION_NAME), daemon=True).start()
         user_query = input("Ask for a book (title or theme): ").strip()
 
     if not user_query:
@@ -1,6 +1,11 @@
 from pathlib import Path
 import json
 
+try:
+    import orjson  # faster native JSON parsing (optional)
+except ImportError:
+    orjson = None
+
 def load_book_summaries(json_path : str):
     """
     Loader function for data/book_summaries.json into python.
@@ -10,6 +15,9 @@ def load_book_summaries(json_path : str):
     if not path.exists():
         raise FileNotFoundError(f"Dataset not found at: {path}")
 
-    data = json.loads(path.read_text(encoding="utf-8"))
+    if orjson is not None:
+        data = orjson.loads(path.read_bytes())
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
 
     return data
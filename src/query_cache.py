@@ -0,0 +1,121 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class QueryCache:
+    """
+    Two-tier cache for search_books results:
+    - exact tier: LRU keyed by (persist_dir, collection, k, model, query)
+    - semantic tier: reuses results of a previous query whose embedding is
+      almost identical (cosine similarity >= threshold) to the new one.
+    Entries expire after `ttl` seconds. Results are copied on the way in and
+    out, so callers can't modify what is cached.
+    """
+
+    def __init__(self, max_size=2000, ttl=600, threshold=0.97):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._exact = OrderedDict()   # key -> (timestamp, items)
+        self._semantic = {}           # scope -> {"vecs": ndarray, "items": [...], "times": [...]}
+
+    # Exact tier
+
+    def get(self, key):
+        """
+        Return cached items for an exact key, or None on miss/expiry.
+        """
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            stamp, items = entry
+            if time.monotonic() - stamp > self.ttl:
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            return copy.deepcopy(items)
+
+    def put(self, key, items):
+        """
+        Store items for an exact key, evicting the least recently used entry.
+        """
+        with self._lock:
+            self._exact[key] = (time.monotonic(), copy.deepcopy(items))
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+    # Semantic tier
+
+    def get_similar(self, scope, qvec):
+        """
+        Return items of the most similar cached query in `scope` if its cosine
+        similarity to `qvec` reaches the threshold, otherwise None.
+        """
+        with self._lock:
+            bucket = self._semantic.get(scope)
+            if not bucket or len(bucket["items"]) == 0:
+                return None
+            self._expire(bucket)
+            if len(bucket["items"]) == 0:
+                return None
+
+            sims = bucket["vecs"] @ _normalize(qvec)
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                return copy.deepcopy(bucket["items"][best])
+            return None
+
+    def put_vector(self, scope, qvec, items):
+        """
+        Remember a query embedding and its results for semantic lookups.
+        """
+        with self._lock:
+            vec = _normalize(qvec)[None, :]
+            bucket = self._semantic.get(scope)
+            if bucket is None:
+                self._semantic[scope] = {
+                    "vecs": vec,
+                    "items": [copy.deepcopy(items)],
+                    "times": [time.monotonic()],
+                }
+                return
+            bucket["vecs"] = np.vstack([bucket["vecs"], vec])[-self.max_size:]
+            bucket["items"] = (bucket["items"] + [copy.deepcopy(items)])[-self.max_size:]
+            bucket["times"] = (bucket["times"] + [time.monotonic()])[-self.max_size:]
+
+    def clear(self):
+        """
+        Drop every cached entry (e.g. after the index was rebuilt).
+        """
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+
+    def _expire(self, bucket):
+        """
+        Remove semantic entries older than the TTL (times are insertion-ordered).
+        """
+        now = time.monotonic()
+        start = 0
+        while start < len(bucket["times"]) and now - bucket["times"][start] > self.ttl:
+            start += 1
+        if start:
+            bucket["vecs"] = bucket["vecs"][start:]
+            bucket["items"] = bucket["items"][start:]
+            bucket["times"] = bucket["times"][start:]
+
+
+def _normalize(vec):
+    """
+    Return a float32 unit vector (so a dot product equals cosine similarity).
+    """
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
@@ -1,38 +1,230 @@
+import asyncio
+import functools
 import json
+import logging
+import os
+import threading
+
+import numpy as np
+
 from database import load_book_summaries
 from utils import get_chroma_client
 from utils import get_openai_client
+from utils import get_async_openai_client
+from query_cache import QueryCache
+
+try:
+    import tiktoken  # exact token counts for batching (optional)
+except ImportError:
+    tiktoken = None
+
+try:
+    import faiss  # exact in-memory search for small libraries (optional)
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Token budget for a single embeddings request
+MAX_TOKENS_PER_REQUEST = 8000
+
+# Max records sent to Chroma in a single upsert
+UPSERT_BATCH_SIZE = 1000
+
+# Below this many distances the plain NumPy path beats the JIT call overhead
+NUMBA_MIN_SIZE = 16
+
+# Libraries up to this size are searched with a FAISS flat index instead of Chroma
+FLAT_INDEX_MAX_VECTORS = 10_000
+
+# Guards first-time opening of collections / flat indexes (the CLI warms up in a thread)
+_INDEX_LOCK = threading.RLock()
+
+# Collection handles already opened in this process, keyed by (persist_dir, name)
+_COLLECTIONS = {}
+
+# FAISS flat indexes loaded from disk, keyed by (persist_dir, name)
+_FLAT_INDEXES = {}
+
+# Cache of search results (exact query + near-duplicate query embeddings)
+_QUERY_CACHE = QueryCache(max_size=2000, ttl=600, threshold=0.97)
 
 
-def embed_texts(client, texts, model_name, batch_size=64):
+def embed_texts(client, texts, model_name, batch_size=256, concurrency=8,
+                max_tokens=MAX_TOKENS_PER_REQUEST, async_client=None):
     """
     Create embeddings for a list of texts (used to build/search the RAG index).
+    Texts are packed into batches by token count (at most `max_tokens` tokens and
+    `batch_size` texts per request); batches are sent concurrently and the output
+    order matches `texts`. The concurrent path uses `async_client` if given,
+    otherwise an AsyncOpenAI client with the same settings as `client`.
     """
     if not isinstance(texts, list):
         raise TypeError("texts must be a list of strings.")
     if len(texts) == 0:
         return []
 
-    embeddings = []
-    for start in range(0, len(texts), batch_size):
-        batch = texts[start:start + batch_size]
-        resp = client.embeddings.create(model=model_name, input=batch)
-        for item in resp.data:
-            embeddings.append(item.embedding)
-    return embeddings
+    batches = _pack_batches(texts, model_name, max_tokens, batch_size)
+
+    # A single batch (or a caller already inside an event loop) stays synchronous
+    if len(batches) == 1 or _in_event_loop():
+        embeddings = []
+        for batch in batches:
+            resp = client.embeddings.create(model=model_name, input=batch)
+            for item in resp.data:
+                embeddings.append(item.embedding)
+        return embeddings
+
+    if async_client is not None:
+        return asyncio.run(_embed_async(async_client, batches, model_name, concurrency))
+
+    async def _run():
+        async with get_async_openai_client(client) as own_client:
+            return await _embed_async(own_client, batches, model_name, concurrency)
+
+    return asyncio.run(_run())
+
+def _pack_batches(texts, model_name, max_tokens, max_items):
+    """
+    Greedily group consecutive texts so each batch stays within the token budget
+    and item cap. A text longer than the budget gets a batch of its own.
+    """
+    count_tokens = _token_counter(model_name)
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        n = count_tokens(text)
+        if batch and (batch_tokens + n > max_tokens or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += n
+    if batch:
+        batches.append(batch)
+    return batches
+
+@functools.lru_cache(maxsize=None)
+def _token_counter(model_name):
+    """
+    Return a function counting tokens for the model (tiktoken when installed,
+    otherwise a ~4 characters per token estimate).
+    """
+    if tiktoken is None:
+        return _estimate_tokens
+    try:
+        try:
+            enc = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken downloads its BPE files on first use; offline, fall back to the estimate
+        logger.debug("tiktoken encoding unavailable for '%s'", model_name, exc_info=True)
+        return _estimate_tokens
+    # encode_ordinary: summaries may contain text like "<|endoftext|>", which
+    # encode() rejects as a special token
+    return lambda text: len(enc.encode_ordinary(text))
+
+def _estimate_tokens(text):
+    """
+    Rough token count (~4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+async def _embed_async(client, batches, model, concurrency=8):
+    """
+    Embed batches in parallel with an AsyncOpenAI client, at most `concurrency` in flight.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(batch):
+        async with sem:
+            resp = await client.embeddings.create(model=model, input=batch)
+        # Items carry their position inside the batch; sort to be safe
+        return [item.embedding for item in sorted(resp.data, key=lambda it: it.index)]
+
+    # gather keeps the batch order, so flattening preserves the input order
+    results = await asyncio.gather(*(_one(b) for b in batches))
+    return [vec for batch_vecs in results for vec in batch_vecs]
+
+def _in_event_loop():
+    """
+    True when called from code already running inside an asyncio loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def cosine_scores_from_distances(distances):
+    """
+    Convert Chroma cosine distances into normalized [0, 1] scores (vectorized).
+    Large arrays go through the Numba kernel when it is available.
+    """
+    d = np.asarray(distances, dtype=np.float64)
+    if d.size > NUMBA_MIN_SIZE:
+        kernel = _scores_kernel()
+        if kernel is not None:
+            return kernel(d).round(3)
+    return np.clip((2.0 - d) * 0.5, 0.0, 1.0).round(3)
+
+@functools.lru_cache(maxsize=None)
+def _scores_kernel():
+    """
+    JIT-compile _scores_loop on first use (numba is imported only here, so the
+    CLI doesn't pay its import time); None when numba isn't installed.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True, fastmath=True)(_scores_loop)
+
+def _scores_loop(d):
+    """
+    clamp((2 - d) / 2, 0, 1) as a plain loop, for bulk rerank paths (see _scores_kernel).
+    """
+    out = np.empty(d.shape[0], dtype=np.float64)
+    for i in range(d.shape[0]):
+        v = (2.0 - d[i]) * 0.5
+        if v < 0.0:
+            v = 0.0
+        elif v > 1.0:
+            v = 1.0
+        out[i] = v
+    return out
 
 def cosine_score_from_distance(distance_value):
     """
-    Build a ChromaDB index with book summaries preparing data for RAG search
+    Scalar convenience wrapper around cosine_scores_from_distances.
+    """
+    return float(cosine_scores_from_distances([distance_value])[0])
+
+def get_collection(persist_dir, collection_name, create=True):
+    """
+    Get or create a cosine Chroma collection, reusing the handle within the process.
+    With create=False a missing collection is not created and None is returned.
     """
-    d = float(distance_value)
-    sim = 1.0 - d
-    norm = (sim + 1.0) / 2.0
-    if norm < 0.0:
-        norm = 0.0
-    if norm > 1.0:
-        norm = 1.0
-    return round(norm, 3)
+    key = (persist_dir, collection_name)
+    with _INDEX_LOCK:
+        collection = _COLLECTIONS.get(key)
+        if collection is not None:
+            return collection
+
+        chroma_client = get_chroma_client(persist_dir)
+        if not create:
+            # list_collections returns names (chroma >= 0.6) or Collection objects
+            names = {getattr(c, "name", c) for c in chroma_client.list_collections()}
+            if collection_name not in names:
+                return None
+        try:
+            collection = chroma_client.get_collection(collection_name)
+        except Exception:
+            collection = chroma_client.create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine"}
+            )
+        _COLLECTIONS[key] = collection
+        return collection
 
 # Index building using cosine
 
@@ -42,16 +234,9 @@ def build_index(json_path, persist_dir, collection_name, embed_model="text-embed
     """
 
     openai_client = get_openai_client()
-    chroma_client = get_chroma_client(persist_dir)
 
     # Get or create a collection in Chroma for cosine indexing
-    try:
-        collection = chroma_client.get_collection(collection_name)
-    except Exception:
-        collection = chroma_client.create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
+    collection = get_collection(persist_dir, collection_name)
 
     # Loading books from JSON
     books = load_book_summaries(json_path)
@@ -65,16 +250,34 @@ def build_index(json_path, persist_dir, collection_name, embed_model="text-embed
         documents.append(book.get("summary", ""))
         title = book.get("title", f"Untitled #{idx}")
         themes = book.get("themes", [])
+        bad = [t for t in themes if "|" in t]
+        if bad:
+            raise ValueError(f"Themes of '{title}' must not contain '|': {bad}")
         metadatas.append({
             "title": title,
-            "themes": ", ".join(themes)
+            # Chroma metadata can't hold lists: pack as "a|b|c" (decoded with one split)
+            "themes": "|".join(themes),
+            "themes_fmt": "psv",
         })
 
     # Embed summaries into vectors
-    vectors = embed_texts(openai_client, documents, embed_model, batch_size=64)
+    vectors = embed_texts(openai_client, documents, embed_model)
 
-    # Insert all data into the Chroma collection
-    collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors)
+    # Insert data into the Chroma collection in chunks to bound peak memory
+    for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+        end = start + UPSERT_BATCH_SIZE
+        collection.upsert(
+            ids=ids[start:end],
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+            embeddings=vectors[start:end],
+        )
+
+    # Shadow copy for the FAISS flat search path
+    _save_flat_index(persist_dir, collection_name, vectors,
+                     [m["title"] for m in metadatas],
+                     [book.get("themes", []) for book in books])
+    _QUERY_CACHE.clear()  # cached results may point to stale data now
     print(f"Indexed {len(ids)} books into '{collection_name}'.")
 
 
@@ -82,24 +285,64 @@ def build_index(json_path, persist_dir, collection_name, embed_model="text-embed
 
 def search_books(query, persist_dir, collection_name, k=3, embed_model="text-embedding-3-small"):
     """
-    Semantic search in Chroma index (RAG entry point).
+    Semantic search in the library index (RAG entry point).
+    Uses the FAISS flat index for small libraries, Chroma otherwise.
     """
-    openai_client = get_openai_client()
-    chroma_client = get_chroma_client(persist_dir)
+    # Exact repeat of a previous query: no API call, no Chroma query
+    scope = (persist_dir, collection_name, k, embed_model)
+    cached = _QUERY_CACHE.get(scope + (query,))
+    if cached is not None:
+        return cached
 
-    # Ensure the target collection exists
-    try:
-        collection = chroma_client.get_collection(collection_name)
-    except Exception:
-        collection = chroma_client.create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
+    openai_client = get_openai_client()
 
     # Embed the user query
     resp = openai_client.embeddings.create(model=embed_model, input=[query])
     qvec = resp.data[0].embedding
 
+    # Near-identical query seen before: reuse its results
+    cached = _QUERY_CACHE.get_similar(scope, qvec)
+    if cached is not None:
+        _QUERY_CACHE.put(scope + (query,), cached)
+        return cached
+
+    # Small libraries: exact search on the flat index; otherwise Chroma HNSW
+    flat = _load_flat_index(persist_dir, collection_name)
+    if flat is not None:
+        items = _query_flat(flat, qvec, k)
+    else:
+        items = _query_chroma(get_collection(persist_dir, collection_name), qvec, k)
+
+    _QUERY_CACHE.put(scope + (query,), items)
+    _QUERY_CACHE.put_vector(scope, qvec, items)
+    return items
+
+def warmup(persist_dir, collection_name):
+    """
+    Load the search index ahead of the first query (call while waiting for input).
+    Only opens an existing index, never creates one. Never raises: a failed warmup
+    is logged at debug level (the CLI is showing its prompt) and just means the
+    first search pays the load cost.
+    """
+    try:
+        if _load_flat_index(persist_dir, collection_name) is not None:
+            return
+        collection = get_collection(persist_dir, collection_name, create=False)
+        if collection is None:
+            return  # nothing indexed yet
+
+        # Query with the dimension the collection was built with (depends on embed_model)
+        stored = collection.get(limit=1, include=["embeddings"]).get("embeddings")
+        if stored is None or len(stored) == 0:
+            return
+        collection.query(query_embeddings=[[0.0] * len(stored[0])], n_results=1, include=[])
+    except Exception as e:
+        logger.debug("Index warmup failed for '%s': %s: %s", collection_name, type(e).__name__, e)
+
+def _query_chroma(collection, qvec, k):
+    """
+    Run a top-k query on the Chroma collection and build result dicts.
+    """
     # Query Chroma with the query embedding (top-k results)
     result = collection.query(
         query_embeddings=[qvec],
@@ -108,30 +351,123 @@ def search_books(query, persist_dir, collection_name, k=3, embed_model="text-emb
     )
 
     # Parse results: collect metadatas and distances
-    items = []
     metadatas_list = result.get("metadatas", [[]])
     distances_list = result.get("distances", [[]])
     if not metadatas_list:
-        return items
+        return []
 
     metadatas = metadatas_list[0]
     distances = distances_list[0] if distances_list else []
 
+    # Score every result at once; missing distances count as 1.0 (score 0.5)
+    distances = list(distances[:len(metadatas)])
+    distances += [1.0] * (len(metadatas) - len(distances))
+    scores = cosine_scores_from_distances(distances)
+
     # Build structured results - title, normalized score, themes
-    for i, meta in enumerate(metadatas):
-        d = float(distances[i]) if i < len(distances) else 1.0
-        score = cosine_score_from_distance(d)
-
-        title = meta.get("title")
-        themes = meta.get("themes")
-        if isinstance(themes, str):
-            try:
-                themes = json.loads(themes)
-            except Exception:
-                themes = [themes]
-        if themes is None:
-            themes = []
-
-        items.append({"title": title, "score": score, "themes": themes})
+    return [
+        {"title": meta.get("title"), "score": float(score), "themes": _parse_themes(meta)}
+        for meta, score in zip(metadatas, scores)
+    ]
 
-    return items
+def _parse_themes(meta):
+    """
+    Decode the themes metadata stored by build_index into a list.
+    """
+    value = meta.get("themes")
+    if not value:
+        return []
+    if meta.get("themes_fmt") == "psv":
+        return value.split("|")
+    return value.split(", ")  # index built before the "|"-packed format
+
+# FAISS flat index (FP16 shadow copy of the Chroma collection for small libraries)
+
+def _flat_paths(persist_dir, collection_name):
+    """
+    File paths of the flat index shadow copy for a collection.
+    """
+    base = os.path.join(persist_dir, collection_name)
+    return base + ".vectors.fp16.npy", base + ".titles.json", base + ".themes.json"
+
+def _save_flat_index(persist_dir, collection_name, vectors, titles, themes):
+    """
+    Persist vectors + titles + themes next to the Chroma data.
+    Vectors are normalized here, once, in FP32 (before the FP16 cast loses
+    precision) and stored as FP16 (half the bytes of FP32); loading relies on it.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    vectors_path, titles_path, themes_path = _flat_paths(persist_dir, collection_name)
+    v = np.asarray(vectors, dtype=np.float32)
+    v /= np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+    np.save(vectors_path, v.astype(np.float16))
+    with open(titles_path, "w", encoding="utf-8") as f:
+        json.dump(titles, f, ensure_ascii=False)
+    with open(themes_path, "w", encoding="utf-8") as f:
+        json.dump(themes, f, ensure_ascii=False)
+    _FLAT_INDEXES.pop((persist_dir, collection_name), None)
+
+def _load_flat_index(persist_dir, collection_name):
+    """
+    Return the cached FAISS flat index for a collection, loading it on first use.
+    None when faiss is missing, no shadow copy exists, or the library is too large
+    (that answer is cached too, until the vectors file changes).
+    """
+    if faiss is None:
+        return None
+    with _INDEX_LOCK:
+        return _read_flat_index(persist_dir, collection_name)
+
+def _read_flat_index(persist_dir, collection_name):
+    """
+    Body of _load_flat_index (called with _INDEX_LOCK held).
+    """
+    vectors_path, titles_path, themes_path = _flat_paths(persist_dir, collection_name)
+    try:
+        mtime = os.stat(vectors_path).st_mtime
+    except FileNotFoundError:
+        return None
+
+    key = (persist_dir, collection_name)
+    flat = _FLAT_INDEXES.get(key)
+    if flat is not None and flat["mtime"] == mtime:
+        return flat if flat["index"] is not None else None
+
+    stored = np.load(vectors_path, mmap_mode="r")
+    if stored.ndim != 2 or stored.shape[0] == 0 or stored.shape[0] > FLAT_INDEX_MAX_VECTORS:
+        _FLAT_INDEXES[key] = {"mtime": mtime, "index": None}  # use Chroma for this file
+        return None
+    with open(titles_path, "r", encoding="utf-8") as f:
+        titles = json.load(f)
+    with open(themes_path, "r", encoding="utf-8") as f:
+        themes = json.load(f)
+
+    # Stored vectors are already unit length (see _save_flat_index), so inner
+    # product == cosine similarity. The index keeps them as FP16 codes; queries
+    # stay FP32 and FAISS decodes on the fly.
+    vectors = np.array(stored, dtype=np.float32)
+    index = faiss.IndexScalarQuantizer(
+        vectors.shape[1], faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(vectors)
+    index.add(vectors)
+
+    flat = {"mtime": mtime, "index": index, "titles": titles, "themes": themes}
+    _FLAT_INDEXES[key] = flat
+    return flat
+
+def _query_flat(flat, qvec, k):
+    """
+    Top-k inner product search on the flat index; score = (cosine + 1) / 2.
+    """
+    q = np.array([qvec], dtype=np.float32)
+    faiss.normalize_L2(q)
+    sims, idx = flat["index"].search(q, k)
+
+    # Same scale as Chroma results: cosine distance = 1 - similarity
+    scores = cosine_scores_from_distances(1.0 - sims[0].astype(np.float64))
+    return [
+        {"title": flat["titles"][i], "score": float(score), "themes": flat["themes"][i]}
+        for i, score in zip(idx[0].tolist(), scores)
+        if i >= 0  # faiss pads with -1 when k exceeds the library size
+    ]
@@ -1,18 +1,60 @@
 import json
 import os
 import difflib
+import unicodedata
+
+import numpy as np
+
+try:
+    from rapidfuzz import process, fuzz  # C-accelerated fuzzy matching (optional)
+except ImportError:
+    process = fuzz = None
 
 JSON_FILE = "../data/book_summaries.json"  # keep it simple
 
+# In-memory cache of the dataset, refreshed only when the file's mtime changes
+_BOOKS_CACHE = {
+    "mtime": None, "data": None, "titles": None, "by_title": None,
+    "titles_norm": None, "titles_len": None,
+}
+
+# Minimum fuzz.ratio score (0-100) for a title match, on _norm strings. Lowercased,
+# article-free strings score higher than the raw ones difflib saw at 0.6, so 75 is
+# needed to keep absent books ("the idiot", "brave heart") from matching a
+# similar-looking title while typos ("hobit", "1948") still resolve.
+MATCH_CUTOFF = 75
+
+# Fuzzy matching first tries titles whose length is within this fraction of the query's
+LENGTH_TOLERANCE = 0.3
+
 def _load_books():
     """
     Load raw list of books from JSON file (base loader for tools).
+    Cached in memory and reloaded only when the file changes on disk.
     """
-    if not os.path.exists(JSON_FILE):
+    try:
+        st = os.stat(JSON_FILE)
+    except FileNotFoundError:
         return []
+    if st.st_mtime == _BOOKS_CACHE["mtime"]:
+        return _BOOKS_CACHE["data"]
+
     with open(JSON_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)
-    return data if isinstance(data, list) else []
+    data = data if isinstance(data, list) else []
+
+    # Precompute lookup structures once per load
+    _BOOKS_CACHE["data"] = data
+    _BOOKS_CACHE["titles"] = [b.get("title", "").strip() for b in data if b.get("title")]
+    _BOOKS_CACHE["by_title"] = {
+        b["title"].strip().lower(): b for b in data if b.get("title")
+    }
+    _BOOKS_CACHE["titles_norm"] = [_norm(t) for t in _BOOKS_CACHE["titles"]]
+    _BOOKS_CACHE["titles_len"] = np.array(
+        [len(t) for t in _BOOKS_CACHE["titles_norm"]], dtype=np.int32
+    )
+    _BOOKS_CACHE["mtime"] = st.st_mtime
+    return data
 
 def get_summary_by_title(title: str) -> str:
     """
@@ -20,25 +62,70 @@ def get_summary_by_title(title: str) -> str:
     """
     if not isinstance(title, str) or not title.strip():
         return ""
-    want = title.strip().lower()
-    for b in _load_books():
-        if b.get("title", "").strip().lower() == want:
-            return b.get("summary", "")
-    return ""
+    if not _load_books():
+        return ""
+    book = _BOOKS_CACHE["by_title"].get(title.strip().lower())
+    return book.get("summary", "") if book else ""
 
 def _all_titles():
     """
     Collect all book titles from the dataset (used for fuzzy matching).
     """
-    return [b.get("title", "").strip() for b in _load_books() if b.get("title")]
+    if not _load_books():
+        return []
+    return _BOOKS_CACHE["titles"]
 
 def match_title(query: str) -> str:
     """
     Fuzzy title helper: given a possibly misspelled title, return the best title or "".
-    Uses difflib (stdlib) so we avoid extra deps.
+    Uses rapidfuzz when installed, otherwise falls back to difflib (stdlib).
+    Titles of similar length are tried first; the full list only if none matches.
+    Both sides are compared in _norm form, so casing, accents, hyphens and a
+    leading article don't matter.
     """
     if not isinstance(query, str) or not query.strip():
         return ""
     titles = _all_titles()
-    best = difflib.get_close_matches(query.strip(), titles, n=1, cutoff=0.6)
-    return best[0] if best else ""
+    if not titles:
+        return ""
+    titles_norm = _BOOKS_CACHE["titles_norm"]
+
+    q = _norm(query)
+    qlen = len(q)
+    mask = np.abs(_BOOKS_CACHE["titles_len"] - qlen) < max(qlen, 1) * LENGTH_TOLERANCE
+    candidates = np.flatnonzero(mask).tolist()
+
+    best = _fuzzy_best(q, [titles_norm[i] for i in candidates])
+    if best is not None:
+        return titles[candidates[best]]
+    if len(candidates) < len(titles):
+        best = _fuzzy_best(q, titles_norm)
+        if best is not None:
+            return titles[best]
+    return ""
+
+def _norm(text):
+    """
+    Normalize a title for matching: lowercase, strip diacritics ("Ș" -> "s"),
+    turn hyphens into spaces, collapse whitespace and drop a leading article
+    ("the hobbit" -> "hobbit"), which would otherwise dominate short titles.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    words = folded.replace("-", " ").split()
+    if len(words) > 1 and words[0] in ("the", "a", "an"):
+        words = words[1:]
+    return " ".join(words)
+
+def _fuzzy_best(query, choices):
+    """
+    Return the index of the best fuzzy match for query in choices, or None.
+    """
+    if not choices:
+        return None
+    if process is not None:
+        # Plain ratio, not WRatio: partial matching sends theme queries down the title path
+        match = process.extractOne(query, choices, scorer=fuzz.ratio, score_cutoff=MATCH_CUTOFF)
+        return match[2] if match else None
+    best = difflib.get_close_matches(query, choices, n=1, cutoff=MATCH_CUTOFF / 100)
+    return choices.index(best[0]) if best else None
@@ -1,45 +1,92 @@
 import os
+import functools
+import threading
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import chromadb
+from dotenv import dotenv_values, load_dotenv
 
+# Read .env once per process; its values are available through os.environ afterwards
+load_dotenv()
+
+_CHROMA_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=None)
 def load_openai_api_key(path=".env"):
     """
     Load API key from environment or .env and ensures that the key is
-    written correctly in case.
+    written correctly in case. Resolved once per path and then memoized.
     """
 
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip().startswith("OPENAI_API_KEY"):
-                    return line.split("=", 1)[1].strip().strip('"').strip("'")
-    except FileNotFoundError:
-        pass
+    key = os.environ.get("OPENAI_API_KEY") or _parse_env_file(path).get("OPENAI_API_KEY")
+    if key:
+        return key.strip().strip('"').strip("'")
     raise ValueError("OPENAI_API_KEY not found in environment or .env")
 
+def _parse_env_file(path):
+    """
+    Read KEY=VALUE pairs from a .env file ({} if the file is missing).
+    """
+    return {k: v for k, v in dotenv_values(path).items() if v is not None}
+
+@functools.lru_cache(maxsize=None)
 def get_openai_client() -> OpenAI:
     """
     Create an OpenAI client with key/project/org (used by retriever + app).
+    Built once per process and reused afterwards.
     """
 
+    return OpenAI(**_openai_client_kwargs())
+
+def get_async_openai_client(client=None) -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client (used for concurrent embeddings). When a sync
+    client is given, its key/org/project/base_url/timeout/retries are copied;
+    otherwise the same credentials as get_openai_client are used.
+    Not cached: async clients are bound to the event loop they run in.
+    """
+
+    if client is not None:
+        return AsyncOpenAI(
+            api_key=client.api_key,
+            organization=client.organization,
+            project=client.project,
+            base_url=client.base_url,
+            timeout=client.timeout,
+            max_retries=client.max_retries,
+        )
+    return AsyncOpenAI(**_openai_client_kwargs())
+
+def _openai_client_kwargs():
+    """
+    Collect key/project/org settings shared by the sync and async clients.
+    """
     key = load_openai_api_key(".env")
     project = os.getenv("OPENAI_PROJECT")  # service account project (optional)
     org = os.getenv("OPENAI_ORG_ID")       # org id (optional)
 
-    return OpenAI(
-        api_key=key,
-        project=project.strip() if project else None,
-        organization=org.strip() if org else None,
-    )
+    return {
+        "api_key": key,
+        "project": project.strip() if project else None,
+        "organization": org.strip() if org else None,
+    }
 
 def get_chroma_client(persist_dir):
     """
     Create or open a persistent ChromaDB client in the given directory.
+    Clients are reused per resolved directory, so the index is opened only once.
     """
     if persist_dir is None or str(persist_dir).strip() == "":
         raise ValueError("persist_dir must be a non-empty string path.")
 
+    with _CHROMA_LOCK:  # lru_cache alone could build two clients when called concurrently
+        return _open_chroma_client(str(Path(persist_dir).resolve()))
+
+@functools.lru_cache(maxsize=None)
+def _open_chroma_client(persist_dir):
+    """
+    Open the PersistentClient for an absolute directory (cached by get_chroma_client).
+    """
     Path(persist_dir).mkdir(parents=True, exist_ok=True)
     client = chromadb.PersistentClient(path=persist_dir)
     return client
@@ -0,0 +1,24 @@
+import importlib
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+def _ensure_module(name, **attrs):
+    """
+    Use the real package when installed; otherwise register a placeholder so
+    utils/retriever/cli import (the tests never reach the real clients).
+    """
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+_ensure_module("openai", OpenAI=object, AsyncOpenAI=object)
+_ensure_module("chromadb", PersistentClient=object)
+_ensure_module("dotenv", load_dotenv=lambda *a, **k: None, dotenv_values=lambda *a, **k: {})
@@ -0,0 +1,53 @@
+"""
+CLI helpers: when the GPT pick is skipped, and the streamed pick itself.
+"""
+import types
+
+import pytest
+
+import cli
+
+
+def _candidates(*scores):
+    return [{"title": f"Book {i}", "score": score} for i, score in enumerate(scores)]
+
+
+@pytest.mark.parametrize("candidates, obvious", [
+    (_candidates(0.55), True),               # single candidate
+    (_candidates(0.90, 0.88, 0.80), True),   # top score >= TOP1_SCORE
+    (_candidates(0.80, 0.60), True),         # margin > TOP1_MARGIN
+    (_candidates(0.80, 0.70, 0.65), False),  # close race
+    (_candidates(0.84, 0.70), False),        # margin exactly 0.14
+])
+def test_is_obvious_top1(candidates, obvious):
+    assert cli._is_obvious_top1(candidates) is obvious
+
+
+class FakeChat:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.kwargs = None
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        for piece in self.pieces:
+            delta = types.SimpleNamespace(content=piece)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+def test_pick_from_titles_streams_the_reply(capsys):
+    client = FakeChat(["Brave New", " World\n", "Because it fits.", None])
+
+    chosen = cli._pick_from_titles("dystopia", ["1984", "Brave New World"], client)
+
+    assert chosen == "Brave New World"
+    assert client.kwargs["stream"] is True
+    assert "Brave New World\nBecause it fits." in capsys.readouterr().out
+
+
+def test_pick_from_titles_falls_back_to_top_result(capsys):
+    chosen = cli._pick_from_titles("x", ["1984", "Dune"], FakeChat(["Something else"]))
+
+    assert chosen == "1984"
+    assert "using the top result: 1984" in capsys.readouterr().out
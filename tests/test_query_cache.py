@@ -0,0 +1,84 @@
+"""
+QueryCache: LRU eviction, TTL expiry, similarity threshold, copy isolation.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import query_cache  # noqa: E402
+from query_cache import QueryCache  # noqa: E402
+
+ITEMS = [{"title": "The Hobbit", "score": 0.9, "themes": ["adventure"]}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(max_size=2)
+    cache.put("a", ITEMS)
+    cache.put("b", ITEMS)
+    cache.get("a")          # "b" is now the least recently used
+    cache.put("c", ITEMS)
+
+    assert cache.get("a") == ITEMS
+    assert cache.get("b") is None
+    assert cache.get("c") == ITEMS
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(ttl=10)
+    cache.put("a", ITEMS)
+    cache.put_vector("scope", [1.0, 0.0], ITEMS)
+
+    clock[0] += 5
+    assert cache.get("a") == ITEMS
+    assert cache.get_similar("scope", [1.0, 0.0]) == ITEMS
+
+    clock[0] += 6
+    assert cache.get("a") is None
+    assert cache.get_similar("scope", [1.0, 0.0]) is None
+
+
+def test_similarity_threshold():
+    cache = QueryCache(threshold=0.97)
+    cache.put_vector("scope", [1.0, 0.0], ITEMS)
+
+    close = [np.cos(0.2), np.sin(0.2)]  # cosine ~0.980
+    far = [np.cos(0.3), np.sin(0.3)]    # cosine ~0.955
+    assert cache.get_similar("scope", close) == ITEMS
+    assert cache.get_similar("scope", far) is None
+    assert cache.get_similar("other scope", close) is None
+
+
+def test_callers_cannot_modify_cached_results():
+    cache = QueryCache()
+    items = [dict(ITEMS[0], themes=list(ITEMS[0]["themes"]))]
+    cache.put("a", items)
+    cache.put_vector("scope", [1.0, 0.0], items)
+
+    items[0]["title"] = "changed by caller"
+    cache.get("a")[0]["themes"].append("changed")
+    cache.get_similar("scope", [1.0, 0.0])[0]["score"] = 0.0
+
+    assert cache.get("a") == ITEMS
+    assert cache.get_similar("scope", [1.0, 0.0]) == ITEMS
+
+
+def test_clear_drops_everything():
+    cache = QueryCache()
+    cache.put("a", ITEMS)
+    cache.put_vector("scope", [1.0, 0.0], ITEMS)
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.get_similar("scope", [1.0, 0.0]) is None
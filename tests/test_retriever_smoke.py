@@ -0,0 +1,250 @@
+"""
+Smoke check: build_index + search_books end-to-end against fake OpenAI/Chroma clients.
+"""
+import hashlib
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import retriever  # noqa: E402
+
+
+def _fake_vector(text, dim=8):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).random(dim).tolist()
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.embeddings = self
+        self.calls = 0
+
+    def create(self, model, input):
+        self.calls += 1
+        data = [types.SimpleNamespace(embedding=_fake_vector(t), index=i) for i, t in enumerate(input)]
+        return types.SimpleNamespace(data=data)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.records = {}
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for i, doc, meta, vec in zip(ids, documents, metadatas, embeddings):
+            self.records[i] = (meta, np.asarray(vec, dtype=np.float64))
+
+    def get(self, limit, include):
+        vecs = [vec.tolist() for _, vec in self.records.values()][:limit]
+        return {"embeddings": vecs}
+
+    def query(self, query_embeddings, n_results, include):
+        q = np.asarray(query_embeddings[0], dtype=np.float64)
+        scored = []
+        for meta, vec in self.records.values():
+            cos = float(q @ vec / (np.linalg.norm(q) * np.linalg.norm(vec)))
+            scored.append((1.0 - cos, meta))
+        scored.sort(key=lambda pair: pair[0])
+        top = scored[:n_results]
+        return {"metadatas": [[m for _, m in top]], "distances": [[d for d, _ in top]]}
+
+
+class FakeChroma:
+    def __init__(self):
+        self.collections = {}
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def create_collection(self, name, metadata=None):
+        self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+
+@pytest.fixture
+def fakes(monkeypatch, tmp_path):
+    openai_client, chroma_client = FakeOpenAI(), FakeChroma()
+    monkeypatch.setattr(retriever, "get_openai_client", lambda: openai_client)
+
+    def fake_get_chroma_client(persist_dir):
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)  # like the real client
+        return chroma_client
+
+    monkeypatch.setattr(retriever, "get_chroma_client", fake_get_chroma_client)
+    monkeypatch.setattr(retriever, "_COLLECTIONS", {})
+    monkeypatch.setattr(retriever, "_FLAT_INDEXES", {}, raising=False)
+    retriever._QUERY_CACHE.clear()
+    return openai_client, str(tmp_path / "embeddings")
+
+
+@pytest.mark.parametrize("use_faiss", [False, True])
+def test_build_then_search(fakes, monkeypatch, use_faiss):
+    openai_client, persist_dir = fakes
+    if not use_faiss:
+        monkeypatch.setattr(retriever, "faiss", None, raising=False)
+    elif getattr(retriever, "faiss", None) is None:
+        pytest.skip("faiss not installed")
+
+    retriever.build_index(str(ROOT / "data" / "book_summaries.json"), persist_dir, "books")
+
+    # The summary of "The Hobbit" is its own nearest neighbour
+    from database import load_book_summaries
+    books = load_book_summaries(str(ROOT / "data" / "book_summaries.json"))
+    hobbit = next(b for b in books if b["title"] == "The Hobbit")
+    items = retriever.search_books(hobbit["summary"], persist_dir, "books", k=3)
+
+    assert len(items) == 3
+    assert items[0]["title"] == "The Hobbit"
+    assert items[0]["score"] == 1.0
+    assert items[0]["themes"] == hobbit["themes"]
+
+    # Repeated query is served from the cache
+    calls = openai_client.calls
+    assert retriever.search_books(hobbit["summary"], persist_dir, "books", k=3) == items
+    assert openai_client.calls == calls
+
+
+class FakeAsyncOpenAI:
+    def __init__(self):
+        self.embeddings = self
+        self.calls = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        data = [types.SimpleNamespace(embedding=_fake_vector(t), index=i) for i, t in enumerate(input)]
+        return types.SimpleNamespace(data=data)
+
+
+def test_parse_themes_formats():
+    assert retriever._parse_themes({"themes": "war|love", "themes_fmt": "psv"}) == ["war", "love"]
+    # Old comma-joined indexes, including values that happen to start with "["
+    assert retriever._parse_themes({"themes": "war, love"}) == ["war", "love"]
+    assert retriever._parse_themes({"themes": "[draft], love"}) == ["[draft]", "love"]
+    assert retriever._parse_themes({"themes": ""}) == []
+
+
+def test_build_index_rejects_pipe_in_themes(fakes, tmp_path):
+    _, persist_dir = fakes
+    path = tmp_path / "books.json"
+    path.write_text('[{"title": "T", "summary": "S", "themes": ["a|b"]}]', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="must not contain"):
+        retriever.build_index(str(path), persist_dir, "books")
+
+
+def test_embed_texts_concurrent_path_uses_given_async_client():
+    sync_client, async_client = FakeOpenAI(), FakeAsyncOpenAI()
+    texts = [f"book {i}" for i in range(10)]
+
+    vectors = retriever.embed_texts(sync_client, texts, "m", batch_size=3, async_client=async_client)
+
+    assert vectors == [_fake_vector(t) for t in texts]
+    assert async_client.calls == 4
+    assert sync_client.calls == 0
+
+
+def test_scores_loop_matches_numpy_path():
+    d = np.linspace(-0.5, 2.5, 40)
+    expected = np.clip((2.0 - d) * 0.5, 0.0, 1.0)
+
+    # The loop Numba compiles, run as plain Python
+    assert np.allclose(retriever._scores_loop(d), expected)
+    assert np.array_equal(retriever.cosine_scores_from_distances(d[:10]), expected[:10].round(3))
+    assert retriever.cosine_score_from_distance(0.5) == 0.75
+
+
+def test_compiled_scores_kernel_matches_numpy_path():
+    pytest.importorskip("numba")
+    d = np.linspace(-0.5, 2.5, 40)
+    kernel = retriever._scores_kernel()
+
+    assert kernel is not None
+    assert np.allclose(kernel(d), np.clip((2.0 - d) * 0.5, 0.0, 1.0))
+
+
+def test_oversized_flat_index_is_skipped_once(monkeypatch, tmp_path):
+    if retriever.faiss is None:
+        pytest.skip("faiss not installed")
+    monkeypatch.setattr(retriever, "_FLAT_INDEXES", {})
+    monkeypatch.setattr(retriever, "FLAT_INDEX_MAX_VECTORS", 2)
+    retriever._save_flat_index(str(tmp_path), "books", np.eye(3).tolist(), ["a", "b", "c"], [[], [], []])
+
+    loads = []
+    real_load = np.load
+    monkeypatch.setattr(retriever.np, "load", lambda *a, **k: loads.append(1) or real_load(*a, **k))
+
+    assert retriever._load_flat_index(str(tmp_path), "books") is None
+    assert retriever._load_flat_index(str(tmp_path), "books") is None
+    assert len(loads) == 1
+
+
+def test_warmup_does_not_create_a_missing_collection(fakes, monkeypatch):
+    _, persist_dir = fakes
+    monkeypatch.setattr(retriever, "faiss", None)
+
+    retriever.warmup(persist_dir, "books")
+
+    assert retriever.get_chroma_client(persist_dir).collections == {}
+
+
+def test_warmup_queries_with_the_index_dimension(fakes, monkeypatch):
+    _, persist_dir = fakes
+    monkeypatch.setattr(retriever, "faiss", None)
+    collection = retriever.get_chroma_client(persist_dir).create_collection("books")
+    collection.upsert(["0"], ["doc"], [{"title": "t"}], [[0.5] * 12])
+
+    seen = []
+    monkeypatch.setattr(FakeCollection, "query", lambda self, **kwargs: seen.append(kwargs))
+    retriever.warmup(persist_dir, "books")
+
+    assert len(seen[0]["query_embeddings"][0]) == 12
+
+
+def test_warmup_logs_failures_quietly(fakes, monkeypatch, caplog):
+    _, persist_dir = fakes
+    monkeypatch.setattr(retriever, "faiss", None)
+    collection = retriever.get_chroma_client(persist_dir).create_collection("books")
+    collection.upsert(["0"], ["doc"], [{"title": "t"}], [[0.5] * 4])
+
+    def broken_query(**kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(FakeCollection, "query", lambda self, **kwargs: broken_query(**kwargs))
+    with caplog.at_level("DEBUG", logger=retriever.logger.name):
+        retriever.warmup(persist_dir, "books")
+
+    [record] = [r for r in caplog.records if "Index warmup failed" in r.getMessage()]
+    assert record.levelname == "DEBUG"
+    assert "RuntimeError: boom" in record.getMessage()
+    assert record.exc_info is None
+
+
+def test_pack_batches_respects_budget_and_item_cap(monkeypatch):
+    monkeypatch.setattr(retriever, "_token_counter", lambda model_name: len)
+
+    # token budget: 4 + 4 fits in 10, a third text would not
+    assert retriever._pack_batches(["aaaa"] * 5, "m", 10, 256) == [["aaaa"] * 2] * 2 + [["aaaa"]]
+    # item cap
+    assert [len(b) for b in retriever._pack_batches(["a"] * 7, "m", 100, 3)] == [3, 3, 1]
+    # an over-budget text gets a batch of its own
+    long_text = "x" * 50
+    assert retriever._pack_batches(["a", long_text, "b"], "m", 10, 256) == [["a"], [long_text], ["b"]]
+
+
+def test_token_counter_accepts_special_token_text():
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        pytest.skip("tiktoken encoding files not available offline")
+    retriever._token_counter.cache_clear()
+
+    assert retriever._token_counter("text-embedding-3-small")("a <|endoftext|> b") > 0
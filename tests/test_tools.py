@@ -0,0 +1,86 @@
+"""
+Title matching against the bundled dataset.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import tools  # noqa: E402
+
+
+@pytest.fixture(autouse=True, params=["rapidfuzz", "difflib"])
+def dataset(request, monkeypatch):
+    monkeypatch.setattr(tools, "JSON_FILE", str(ROOT / "data" / "book_summaries.json"))
+    if request.param == "difflib":
+        monkeypatch.setattr(tools, "process", None)
+    elif tools.process is None:
+        pytest.skip("rapidfuzz not installed")
+
+
+@pytest.mark.parametrize("query, title", [
+    ("hobbit", "The Hobbit"),
+    ("hobit", "The Hobbit"),
+    ("1948", "1984"),
+    ("to kill a mocking-bird", "To Kill a Mockingbird"),
+    ("war and piece", "War and Peace"),
+    ("brothers karamazov", "The Brothers Karamazov"),
+    ("great gatsbi", "The Great Gatsby"),
+    ("the cather in the rye", "The Catcher in the Rye"),
+])
+def test_match_title_resolves_typos(query, title):
+    assert tools.match_title(query) == title
+
+
+@pytest.mark.parametrize("query", [
+    "love",
+    "war",
+    "freedom and totalitarian control",
+    "a story about friendship and war",
+    "great",
+    "kill",
+    "world",
+    "peace",
+])
+def test_match_title_leaves_theme_queries_to_rag(query):
+    assert tools.match_title(query) == ""
+
+
+@pytest.mark.parametrize("query", [
+    "the idiot",
+    "the hunger games",
+    "crime and punishment",
+    "the great expectations",
+    "brave heart",
+    "the brothers grimm",
+    "new world order",
+    "anna karenina",
+])
+def test_match_title_rejects_books_not_in_library(query):
+    assert tools.match_title(query) == ""
+
+
+def test_get_summary_by_title_is_case_insensitive():
+    assert tools.get_summary_by_title("the hobbit") == tools.get_summary_by_title("The Hobbit") != ""
+
+
+def test_match_title_folds_diacritics(tmp_path, monkeypatch):
+    books = [
+        {"title": "Cartea Șoaptelor", "summary": "O poveste.", "themes": ["magie"]},
+        {"title": "Țară și Ființă Înșelătoare", "summary": "Alt roman.", "themes": []},
+        {"title": "The Hobbit", "summary": "A hobbit's tale.", "themes": ["adventure"]},
+    ]
+    path = tmp_path / "books.json"
+    path.write_text(json.dumps(books, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(tools, "JSON_FILE", str(path))
+
+    assert tools._norm("Cartea Șoaptelor") == "cartea soaptelor"
+    assert tools.match_title("cartea soaptelor") == "Cartea Șoaptelor"
+    # Unfolded, this query scores below MATCH_CUTOFF against the accented title
+    assert tools.match_title("tara si fiinta inselatoare") == "Țară și Ființă Înșelătoare"
+    assert tools.match_title("Cartea Soaptelor") == "Cartea Șoaptelor"
+    assert tools.get_summary_by_title(tools.match_title("cartea soaptelor")) == "O poveste."